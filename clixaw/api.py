@@ -2,19 +2,244 @@
 
 import os
 import urllib.parse
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
-import requests
-
-from clixaw import cache
+from clixaw import cache, semcache
 from clixaw import __version__
 
+# requests is imported on first use, so cache hits never pay for loading it
+if TYPE_CHECKING:
+    import requests
+
+
+# Shared HTTP session, created on first use and kept for the process lifetime
+_SESSION: Optional["requests.Session"] = None
+
+# Largest response body accepted as a command; anything bigger is an error page
+MAX_RESPONSE_BYTES = 64 * 1024
+
+# Most queries of a batch translated at once (the session's pool size)
+BATCH_MAX_WORKERS = 8
+
 
 def get_api_url() -> str:
     """Get the API URL from environment variable or use default."""
     return os.getenv("XAW_API_URL", "https://cmd.xaw.me")
 
 
+def _get_session() -> "requests.Session":
+    """
+    Get the shared HTTP session, creating it on first use.
+    
+    Reusing one session keeps the connection to the API alive, so the
+    path-style fallback and later calls skip the TCP/TLS handshake.
+    """
+    global _SESSION
+    
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _SESSION = session
+    
+    return _SESSION
+
+
+# Result of one API request: (command, etag, last_modified). The command is
+# None when the server answered 304 Not Modified to a conditional request.
+FetchResult = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def _fetch_command(url: str, headers: Dict[str, str]) -> FetchResult:
+    """
+    Request a translation from a single API URL.
+    
+    Raises:
+        requests.RequestException: If the API request fails
+        ValueError: If the response is empty or too large
+    """
+    # Stream the body so a misbehaving server can't make us read and decode
+    # a huge error page; only the first MAX_RESPONSE_BYTES are accepted
+    with _get_session().get(url, headers=headers, timeout=10, stream=True) as response:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        
+        if response.status_code == 304:
+            return None, etag, last_modified
+        
+        # Reading small bodies to the end, error pages included, lets the
+        # connection go back to the pool instead of being closed
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=8192):
+            body += chunk
+            if len(body) > MAX_RESPONSE_BYTES:
+                break
+        
+        response.raise_for_status()
+    
+    if len(body) > MAX_RESPONSE_BYTES:
+        raise ValueError("API response is too large")
+    
+    # API returns plain UTF-8 text; strip whitespace before decoding
+    command = bytes(body).strip().decode("utf-8", "replace")
+    
+    if not command:
+        raise ValueError("API returned empty response")
+    
+    return command, etag, last_modified
+
+
+def _fetch_with_fallback(
+    query_url: str, path_url: str, headers: Dict[str, str]
+) -> FetchResult:
+    """
+    Request a translation, falling back from query-style to path-style.
+    
+    The path-style request is only sent once the query-style one has failed.
+    The backend is an LLM whose normal latency is seconds, so starting it
+    early for a merely slow response would often pay for the same
+    translation twice.
+    
+    Raises:
+        requests.RequestException: The query-style error, if both requests fail
+        ValueError: If the response is empty
+    """
+    import requests
+    
+    # Try query parameter style first (more reliable for special characters)
+    try:
+        return _fetch_command(query_url, headers)
+    except requests.exceptions.RequestException as query_error:
+        try:
+            return _fetch_command(path_url, headers)
+        except requests.exceptions.RequestException:
+            # Both failed: raise the original (query-style) exception
+            raise query_error
+
+
+def _cached_command(
+    query: str,
+    api_url: str,
+    provider: Optional[str],
+    api_key: Optional[str],
+    model: Optional[str],
+    semantic_cache: bool,
+) -> Optional[str]:
+    """Look a query up in the exact cache, then in the semantic cache."""
+    cached_command = cache.get_cached_response(
+        query, api_url, provider, api_key, model
+    )
+    if cached_command is not None:
+        return cached_command
+    
+    # Then look for a paraphrase of an earlier query
+    if semantic_cache:
+        try:
+            match = semcache.lookup(query, api_url, provider, model)
+        except Exception:
+            # The semantic cache is best-effort (e.g. model download failed)
+            match = None
+        if match is not None:
+            # Keep the matched entry's age, so it expires on the same schedule
+            cached_command, stored_at = match
+            cache.set_cached_response(
+                query, cached_command, api_url, provider, api_key, model, timestamp=stored_at
+            )
+            return cached_command
+    
+    return None
+
+
+def _build_request(
+    query: str,
+    api_url: str,
+    provider: Optional[str],
+    api_key: Optional[str],
+    model: Optional[str],
+    use_cache: bool,
+) -> Tuple[str, str, Dict[str, str]]:
+    """
+    Build the URLs and headers for translating a query.
+    
+    Returns:
+        (query-style URL, path-style URL, headers)
+    """
+    # Build headers if provider is specified
+    headers = {"X-xaw-cli": __version__}
+    if provider:
+        headers["X-Provider"] = provider
+    if api_key:
+        headers["X-API-Key"] = api_key
+    if model:
+        headers["X-Model"] = model
+    
+    # If an expired cache entry has validators, ask the server whether it is
+    # still current; a 304 refreshes it without transferring the command
+    if use_cache:
+        headers.update(
+            cache.get_revalidation_headers(query, api_url, provider, api_key, model)
+        )
+    
+    # Encode the query once for both URL styles
+    encoded_query = urllib.parse.quote(query, safe="")
+    query_url = f"{api_url}/?q={encoded_query}"
+    path_url = f"{api_url}/{encoded_query}"
+    
+    return query_url, path_url, headers
+
+
+def _store_result(
+    query: str,
+    result: FetchResult,
+    api_url: str,
+    provider: Optional[str],
+    api_key: Optional[str],
+    model: Optional[str],
+    use_cache: bool,
+    semantic_cache: bool,
+) -> str:
+    """
+    Cache a fetched translation and return its command.
+    
+    Raises:
+        ValueError: If the server answered 304 but nothing is cached
+    """
+    command, etag, last_modified = result
+    
+    if command is None:
+        # 304 Not Modified: the expired cached command is still valid
+        command = cache.refresh_cached_response(query, api_url, provider, api_key, model)
+        if command is None:
+            raise ValueError("API returned 304 Not Modified without a cached response")
+        return command
+    
+    # Cache the response
+    if use_cache:
+        cache.set_cached_response(
+            query,
+            command,
+            api_url,
+            provider,
+            api_key,
+            model,
+            etag=etag,
+            last_modified=last_modified,
+        )
+    
+    if semantic_cache:
+        try:
+            semcache.store(query, command, api_url, provider, model)
+        except Exception:
+            pass
+    
+    return command
+
+
 def translate_query(
     query: str,
     api_url: Optional[str] = None,
@@ -22,6 +247,7 @@ def translate_query(
     api_key: Optional[str] = None,
     model: Optional[str] = None,
     use_cache: bool = True,
+    semantic_cache: bool = False,
 ) -> str:
     """
     Translate a natural language query to a shell command.
@@ -33,6 +259,8 @@ def translate_query(
         api_key: Optional API key for custom provider
         model: Optional model override (e.g., "gemini-pro", "gpt-4")
         use_cache: Whether to use cache (default: True)
+        semantic_cache: Whether to also match paraphrases of cached queries
+            by embedding similarity (default: False; needs numpy and fastembed)
     
     Returns:
         Translated shell command as plain text
@@ -47,64 +275,105 @@ def translate_query(
     # Remove trailing slash if present
     api_url = api_url.rstrip("/")
     
+    # Skip every cache call below if caching is disabled in the config file
+    use_cache = use_cache and cache.is_enabled()
+    semantic_cache = use_cache and semantic_cache and semcache.is_available()
+    
     # Check cache first
     if use_cache:
-        cached_command = cache.get_cached_response(
-            query, api_url, provider, api_key, model
-        )
+        cached_command = _cached_command(query, api_url, provider, api_key, model, semantic_cache)
         if cached_command is not None:
             return cached_command
     
-    # Build headers if provider is specified
-    headers = {"X-xaw-cli": __version__}
-    if provider:
-        headers["X-Provider"] = provider
-    if api_key:
-        headers["X-API-Key"] = api_key
-    if model:
-        headers["X-Model"] = model
+    query_url, path_url, headers = _build_request(query, api_url, provider, api_key, model, use_cache)
+    result = _fetch_with_fallback(query_url, path_url, headers)
     
-    # Try query parameter style first (more reliable for special characters)
-    try:
-        encoded_query = urllib.parse.quote(query, safe="")
-        url = f"{api_url}/?q={encoded_query}"
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # API returns plain text, strip whitespace
-        command = response.text.strip()
-        
-        if not command:
-            raise ValueError("API returned empty response")
-        
-        # Cache the response
+    return _store_result(
+        query, result, api_url, provider, api_key, model, use_cache, semantic_cache
+    )
+
+
+def translate_query_batch(
+    queries: List[str],
+    api_url: Optional[str] = None,
+    provider: Optional[str] = None,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+    use_cache: bool = True,
+    semantic_cache: bool = False,
+) -> List[Union[str, Exception]]:
+    """
+    Translate several natural language queries to shell commands.
+    
+    The API has no batch endpoint, so every uncached query is still its own
+    request, but they run in parallel over the shared session's connection
+    pool instead of one after another. Cache lookups and updates stay on the
+    calling thread. A query repeated in the batch is only translated once.
+    A failing query doesn't affect the others: its error is returned in
+    place of its command.
+    
+    Args:
+        queries: Natural language query strings
+        api_url: Optional API URL (defaults to XAW_API_URL env var or https://cmd.xaw.me)
+        provider: Optional provider name (e.g., "openai", "gemini")
+        api_key: Optional API key for custom provider
+        model: Optional model override (e.g., "gemini-pro", "gpt-4")
+        use_cache: Whether to use cache (default: True)
+        semantic_cache: Whether to also match paraphrases of cached queries
+            by embedding similarity (default: False; needs numpy and fastembed)
+    
+    Returns:
+        For each query, in the same order, its translated shell command, or
+        the exception translating it raised (requests.RequestException if
+        the API request failed, ValueError if the response was invalid)
+    """
+    if api_url is None:
+        api_url = get_api_url()
+    
+    # Remove trailing slash if present
+    api_url = api_url.rstrip("/")
+    
+    # Skip every cache call below if caching is disabled in the config file
+    use_cache = use_cache and cache.is_enabled()
+    semantic_cache = use_cache and semantic_cache and semcache.is_available()
+    
+    commands: Dict[str, Union[str, Exception]] = {}
+    misses: List[str] = []
+    for query in dict.fromkeys(queries):
+        cached_command = None
         if use_cache:
-            cache.set_cached_response(query, command, api_url, provider, api_key, model)
-        
-        return command
+            cached_command = _cached_command(query, api_url, provider, api_key, model, semantic_cache)
+        if cached_command is None:
+            misses.append(query)
+        else:
+            commands[query] = cached_command
     
-    except requests.exceptions.RequestException as e:
-        # If query parameter style fails, try path-based
+    if not misses:
+        return [commands[query] for query in queries]
+    
+    fetches = [
+        _build_request(query, api_url, provider, api_key, model, use_cache)
+        for query in misses
+    ]
+    
+    def fetch(request: Tuple[str, str, Dict[str, str]]):
         try:
-            encoded_query = urllib.parse.quote(query, safe="")
-            url = f"{api_url}/{encoded_query}"
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            command = response.text.strip()
-            
-            if not command:
-                raise ValueError("API returned empty response")
-            
-            # Cache the response
-            if use_cache:
-                cache.set_cached_response(query, command, api_url, provider, api_key, model)
-            
-            return command
-        
-        except requests.exceptions.RequestException:
-            # Re-raise the original exception
-            raise e
-
+            return _fetch_with_fallback(*request), None
+        except Exception as e:
+            return None, e
+    
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(misses))) as pool:
+        outcomes = list(pool.map(fetch, fetches))
+    
+    for query, (result, error) in zip(misses, outcomes):
+        if error is None:
+            try:
+                commands[query] = _store_result(
+                    query, result, api_url, provider, api_key, model, use_cache, semantic_cache
+                )
+            except ValueError as e:
+                commands[query] = e
+        else:
+            commands[query] = error
+    
+    return [commands[query] for query in queries]
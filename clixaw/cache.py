@@ -1,13 +1,22 @@
 """Client-side caching for API responses."""
 
+import atexit
 import hashlib
 import json
-from datetime import datetime, timedelta
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from clixaw import config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # Default cache TTL: 7 days
 DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
@@ -15,20 +24,65 @@ DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
 # Default max cache size: 1000 entries
 DEFAULT_MAX_CACHE_SIZE = 1000
 
+# The log is compacted once it holds this many times max_size records
+CACHE_COMPACT_FACTOR = 2
+
+# In-memory copy of the cache file, ordered from least to most recently used
+_CACHE: Optional["OrderedDict[str, Dict[str, Any]]"] = None
+
+# Keys stored since the last flush that still need to be appended to the log
+_PENDING: List[str] = []
+
+# Whether the whole log must be rewritten (it has torn or corrupted records)
+_REWRITE = False
+
+# Number of records currently in the log file
+_LOG_RECORDS = 0
+
+# (inode, mtime, size) of the log when it was last read or written by this
+# process; if it differs, another process has changed the file
+_LOG_STAMP: Optional[Tuple[int, int, int]] = None
+
+# Cache settings, and the parsed config file they were read from
+_CACHE_CONFIG: Optional[Dict[str, Any]] = None
+_CACHE_CONFIG_SOURCE: Optional[Dict[str, Any]] = None
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize an object to compact UTF-8 JSON, using orjson if installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    """Parse UTF-8 JSON, using orjson if installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def get_cache_path() -> Path:
     """Get the path to the cache file."""
-    return config.get_config_dir() / "cache.json"
+    return config.get_config_dir() / "cache.jsonl"
 
 
 def get_cache_config() -> Dict[str, Any]:
     """
     Get cache configuration from config file.
     
+    The settings are rebuilt only when config.load_config() has reparsed
+    the file. The XAW_CACHE_TTL environment variable, if set to a number of seconds,
+    overrides the TTL from the config file.
+    
     Returns:
         Dictionary with cache settings (ttl, max_size, enabled)
     """
+    global _CACHE_CONFIG, _CACHE_CONFIG_SOURCE
+    
     cfg = config.load_config()
+    if _CACHE_CONFIG is not None and cfg is _CACHE_CONFIG_SOURCE:
+        return _CACHE_CONFIG
     
     cache_config = {
         "ttl": DEFAULT_CACHE_TTL_SECONDS,
@@ -41,9 +95,24 @@ def get_cache_config() -> Dict[str, Any]:
         cache_config["max_size"] = cfg["cache"].get("max_size", DEFAULT_MAX_CACHE_SIZE)
         cache_config["enabled"] = cfg["cache"].get("enabled", True)
     
+    ttl_env = os.getenv("XAW_CACHE_TTL")
+    if ttl_env:
+        try:
+            cache_config["ttl"] = int(ttl_env)
+        except ValueError:
+            # Ignore invalid values and keep the configured TTL
+            pass
+    
+    _CACHE_CONFIG = cache_config
+    _CACHE_CONFIG_SOURCE = cfg
     return cache_config
 
 
+def is_enabled() -> bool:
+    """Check whether caching is enabled in the config file."""
+    return bool(get_cache_config().get("enabled", True))
+
+
 def generate_cache_key(
     query: str,
     api_url: str,
@@ -62,54 +131,212 @@ def generate_cache_key(
         model: Optional model name
     
     Returns:
-        SHA256 hash string as cache key
+        16-character BLAKE2b hex digest as cache key
     """
     # Create a string representation of the cache parameters
     # Note: We don't include api_key in the hash for security/privacy reasons
     # Different API keys with same query/provider/model should use same cache
     cache_string = f"{query}|{api_url}|{provider or ''}|{model or ''}"
     
-    return hashlib.sha256(cache_string.encode("utf-8")).hexdigest()
+    # Keys only need to be unique, not cryptographically strong. An 8-byte
+    # digest needs several hundred million entries before a 1% chance of a
+    # collision, far beyond DEFAULT_MAX_CACHE_SIZE. Entries stored under old
+    # SHA-256 keys are simply never hit again and age out via TTL/max size.
+    return hashlib.blake2b(cache_string.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _log_stamp() -> Optional[Tuple[int, int, int]]:
+    """Get the (inode, mtime, size) of the cache log, or None if it doesn't exist."""
+    try:
+        st = get_cache_path().stat()
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
 
 
 def load_cache() -> Dict[str, Dict[str, Any]]:
     """
     Load cache from file.
     
+    The cache file is an append-only log with one JSON record per line;
+    later records for the same key replace earlier ones. Later calls return
+    the same in-memory dictionary, and changes are written back at exit.
+    The file is only read again if another process has changed it since
+    (checked with one stat, like config.load_config); entries this process
+    hasn't written yet are kept on top of the reloaded ones.
+    
     Returns:
         Dictionary mapping cache keys to cache entries
     """
-    cache_path = get_cache_path()
+    global _CACHE, _REWRITE, _LOG_RECORDS, _LOG_STAMP
     
-    if not cache_path.exists():
-        return {}
+    if _CACHE is not None and _log_stamp() == _LOG_STAMP:
+        return _CACHE
+    
+    previous = _CACHE
+    cache_path = get_cache_path()
+    _CACHE = OrderedDict()
+    _LOG_RECORDS = 0
+    _LOG_STAMP = None
+    _REWRITE = False
     
     try:
-        with open(cache_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        # If cache file is corrupted, return empty dict
-        return {}
+        with open(cache_path, "rb") as f:
+            # Stamp before reading, so an append made meanwhile causes a reload
+            st = os.fstat(f.fileno())
+            _LOG_STAMP = (st.st_ino, st.st_mtime_ns, st.st_size)
+            
+            for line in f:
+                _LOG_RECORDS += 1
+                
+                if not line.endswith(b"\n"):
+                    # Torn last line from an interrupted write; rewrite the log
+                    # so the next append doesn't get glued onto it
+                    _REWRITE = True
+                
+                try:
+                    entry = _loads(line)
+                except ValueError:
+                    entry = None
+                
+                key = entry.pop("key", None) if isinstance(entry, dict) else None
+                if not isinstance(key, str):
+                    # Skip corrupted records instead of dropping the whole cache
+                    _REWRITE = True
+                    continue
+                
+                # Stores and hits are logged in the order they happen, so
+                # replaying the log restores the least-recently-used order
+                _CACHE[key] = entry
+                _CACHE.move_to_end(key)
+    except IOError:
+        pass
+    
+    if previous is not None:
+        # Keep this process's unsaved changes as the most recently used
+        for key in _PENDING:
+            if key in previous:
+                _CACHE[key] = previous[key]
+                _CACHE.move_to_end(key)
+    
+    # Drop entries evicted since the last compaction (the oldest ones)
+    max_size = get_cache_config().get("max_size", DEFAULT_MAX_CACHE_SIZE)
+    while len(_CACHE) > max_size:
+        _CACHE.popitem(last=False)
+    
+    return _CACHE
 
 
 def save_cache(cache: Dict[str, Dict[str, Any]]) -> None:
     """
-    Save cache to file.
+    Save cache to file, replacing the existing log.
+    
+    The new log is written to a temporary file and swapped in with
+    os.replace, so an interrupted write can't leave a truncated cache.
     
     Args:
         cache: Dictionary mapping cache keys to cache entries
     """
+    global _LOG_RECORDS, _LOG_STAMP
+    
     cache_path = get_cache_path()
+    tmp_path = cache_path.with_suffix(".jsonl.tmp")
     
     # Ensure config directory exists
     cache_path.parent.mkdir(parents=True, exist_ok=True)
     
     try:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(cache, f, indent=2, ensure_ascii=False)
+        with open(tmp_path, "wb") as f:
+            f.writelines(_format_record(key, entry) for key, entry in cache.items())
+        os.replace(tmp_path, cache_path)
+        _LOG_RECORDS = len(cache)
+        _LOG_STAMP = _log_stamp()
     except IOError:
-        # Silently fail if we can't write cache
-        pass
+        # Silently fail if we can't write cache, leaving the old log intact
+        try:
+            tmp_path.unlink()
+        except IOError:
+            pass
+
+
+def _format_record(key: str, entry: Dict[str, Any]) -> bytes:
+    """Format a cache entry as one line of the cache log."""
+    return _dumps({"key": key, **entry}) + b"\n"
+
+
+def flush_cache() -> None:
+    """
+    Write unsaved cache changes to disk.
+    
+    New entries, and entries used since the last write, are appended to the
+    log. The log is only rewritten when it has corrupted records or has
+    grown well past the max cache size, after taking in any records other
+    processes appended, so a long-running daemon doesn't drop them.
+    """
+    global _PENDING, _REWRITE, _LOG_RECORDS, _LOG_STAMP
+    
+    if _CACHE is None:
+        return
+    
+    # Pick up changes made by other processes (including a cleared cache)
+    load_cache()
+    
+    max_size = get_cache_config().get("max_size", DEFAULT_MAX_CACHE_SIZE)
+    
+    if _REWRITE or _LOG_RECORDS + len(_PENDING) > CACHE_COMPACT_FACTOR * max_size:
+        save_cache(_CACHE)
+    elif _PENDING:
+        cache_path = get_cache_path()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # A key used several times is logged once, at its last use
+        keys = list(dict.fromkeys(reversed(_PENDING)))
+        keys.reverse()
+        records = [_format_record(key, _CACHE[key]) for key in keys if key in _CACHE]
+        try:
+            with open(cache_path, "ab") as f:
+                st = os.fstat(f.fileno())
+                # (an empty file was just created by this append)
+                unchanged = (st.st_ino, st.st_mtime_ns, st.st_size) == _LOG_STAMP or (
+                    _LOG_STAMP is None and st.st_size == 0
+                )
+                f.writelines(records)
+                f.flush()
+                st = os.fstat(f.fileno())
+            _LOG_RECORDS += len(records)
+            # Only this process's records were added, so the loaded copy is
+            # still current; otherwise the next load_cache() reloads
+            if unchanged:
+                _LOG_STAMP = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except IOError:
+            pass
+    
+    _PENDING = []
+    _REWRITE = False
+
+
+atexit.register(flush_cache)
+
+
+def _entry_timestamp(entry: Dict[str, Any]) -> Optional[float]:
+    """
+    Get the time an entry was stored, as seconds since the epoch.
+    
+    Entries written by older versions store an ISO-format string instead of
+    a number; those are parsed until they age out of the cache.
+    
+    Returns:
+        Timestamp in seconds, or None if the entry has no valid timestamp
+    """
+    ts = entry.get("timestamp")
+    
+    if isinstance(ts, (int, float)):
+        return ts
+    
+    try:
+        return datetime.fromisoformat(ts).timestamp()
+    except (ValueError, TypeError):
+        return None
 
 
 def get_cached_response(
@@ -134,7 +361,8 @@ def get_cached_response(
     """
     cache_config = get_cache_config()
     
-    # Check if caching is enabled
+    # Check if caching is enabled (from the settings already fetched, rather
+    # than is_enabled(), which would stat the config file again)
     if not cache_config.get("enabled", True):
         return None
     
@@ -146,22 +374,98 @@ def get_cached_response(
     
     entry = cache[cache_key]
     
-    # Check if entry is expired
-    try:
-        cached_time = datetime.fromisoformat(entry.get("timestamp", ""))
-        ttl_seconds = cache_config.get("ttl", DEFAULT_CACHE_TTL_SECONDS)
-        
-        if datetime.now() - cached_time > timedelta(seconds=ttl_seconds):
-            # Entry expired, remove it
+    # Check if entry is expired (or has an invalid timestamp)
+    cached_time = _entry_timestamp(entry)
+    ttl_seconds = cache_config.get("ttl", DEFAULT_CACHE_TTL_SECONDS)
+    
+    if cached_time is None or time.time() - cached_time > ttl_seconds:
+        # Entry expired. Keep it if the server gave validators, so it can be
+        # revalidated with a conditional request; otherwise drop it from
+        # memory only. The expired entry isn't written: the stale record stays
+        # in the log, is skipped the same way on later runs, and disappears
+        # at the next compaction.
+        if not (entry.get("etag") or entry.get("last_modified")):
             del cache[cache_key]
-            save_cache(cache)
-            return None
-    except (ValueError, TypeError):
-        # Invalid timestamp, remove entry
-        del cache[cache_key]
-        save_cache(cache)
         return None
     
+    # Mark as most recently used so it is evicted last, and log the use so
+    # later runs see the same order
+    cache.move_to_end(cache_key)
+    _PENDING.append(cache_key)
+    
+    return entry.get("command")
+
+
+def get_revalidation_headers(
+    query: str,
+    api_url: str,
+    provider: Optional[str] = None,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Get conditional request headers for a cached entry.
+    
+    Only meaningful after get_cached_response() found the entry expired;
+    if the server answers 304 Not Modified, call refresh_cached_response().
+    
+    Args:
+        query: Natural language query
+        api_url: API URL
+        provider: Optional provider name
+        api_key: Optional API key
+        model: Optional model name
+    
+    Returns:
+        If-None-Match / If-Modified-Since headers, or an empty dict
+    """
+    if not is_enabled():
+        return {}
+    
+    cache = load_cache()
+    entry = cache.get(generate_cache_key(query, api_url, provider, api_key, model))
+    
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    
+    return headers
+
+
+def refresh_cached_response(
+    query: str,
+    api_url: str,
+    provider: Optional[str] = None,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Mark a cached entry as fresh again after a 304 Not Modified response.
+    
+    Args:
+        query: Natural language query
+        api_url: API URL
+        provider: Optional provider name
+        api_key: Optional API key
+        model: Optional model name
+    
+    Returns:
+        The cached command, or None if there is no such entry
+    """
+    cache = load_cache()
+    cache_key = generate_cache_key(query, api_url, provider, api_key, model)
+    entry = cache.get(cache_key)
+    
+    if entry is None:
+        return None
+    
+    entry["timestamp"] = time.time()
+    cache.move_to_end(cache_key)
+    _PENDING.append(cache_key)
+    
     return entry.get("command")
 
 
@@ -172,6 +476,9 @@ def set_cached_response(
     provider: Optional[str] = None,
     api_key: Optional[str] = None,
     model: Optional[str] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    timestamp: Optional[float] = None,
 ) -> None:
     """
     Store a response in the cache.
@@ -183,10 +490,15 @@ def set_cached_response(
         provider: Optional provider name
         api_key: Optional API key
         model: Optional model name
+        etag: Optional ETag header from the response
+        last_modified: Optional Last-Modified header from the response
+        timestamp: When the command was fetched, if not just now (e.g. when
+            copying it from the semantic cache, so it doesn't live longer)
     """
     cache_config = get_cache_config()
     
-    # Check if caching is enabled
+    # Check if caching is enabled (from the settings already fetched, rather
+    # than is_enabled(), which would stat the config file again)
     if not cache_config.get("enabled", True):
         return
     
@@ -195,38 +507,45 @@ def set_cached_response(
     
     # Create cache entry
     entry = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": time.time() if timestamp is None else timestamp,
         "query": query,
         "command": command,
         "api_url": api_url,
         "provider": provider,
         "model": model,
+        "etag": etag,
+        "last_modified": last_modified,
     }
     
     cache[cache_key] = entry
+    cache.move_to_end(cache_key)
+    _PENDING.append(cache_key)
     
-    # Enforce max cache size
+    # Enforce max cache size by evicting the least recently used entries.
+    # Evicted entries stay in the log until the next compaction and are
+    # dropped again on load, so they don't force a rewrite.
     max_size = cache_config.get("max_size", DEFAULT_MAX_CACHE_SIZE)
-    if len(cache) > max_size:
-        # Remove oldest entries (by timestamp)
-        entries = [(k, v) for k, v in cache.items()]
-        entries.sort(key=lambda x: x[1].get("timestamp", ""))
-        
-        # Keep only the most recent max_size entries
-        cache = dict(entries[-max_size:])
-    
-    save_cache(cache)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
 
 
 def clear_cache() -> None:
     """Clear all cached responses."""
-    cache_path = get_cache_path()
-    
-    if cache_path.exists():
-        try:
-            cache_path.unlink()
-        except IOError:
-            pass
+    global _CACHE, _PENDING, _REWRITE, _LOG_STAMP
+    
+    _CACHE = None
+    _PENDING = []
+    _REWRITE = False
+    _LOG_STAMP = None
+    
+    # Also remove the cache.json written by older versions, which is no
+    # longer read
+    for path in (get_cache_path(), config.get_config_dir() / "cache.json"):
+        if path.exists():
+            try:
+                path.unlink()
+            except IOError:
+                pass
 
 
 def get_cache_stats() -> Dict[str, Any]:
@@ -245,15 +564,19 @@ def get_cache_stats() -> Dict[str, Any]:
             "newest_entry": None,
         }
     
-    timestamps = []
+    # Track oldest and newest in a single pass over the entries
+    oldest = None
+    newest = None
     for entry in cache.values():
-        try:
-            ts = datetime.fromisoformat(entry.get("timestamp", ""))
-            timestamps.append(ts)
-        except (ValueError, TypeError):
+        ts = _entry_timestamp(entry)
+        if ts is None:
             continue
+        if oldest is None or ts < oldest:
+            oldest = ts
+        if newest is None or ts > newest:
+            newest = ts
     
-    if not timestamps:
+    if oldest is None:
         return {
             "size": len(cache),
             "oldest_entry": None,
@@ -262,7 +585,7 @@ def get_cache_stats() -> Dict[str, Any]:
     
     return {
         "size": len(cache),
-        "oldest_entry": min(timestamps).isoformat() if timestamps else None,
-        "newest_entry": max(timestamps).isoformat() if timestamps else None,
+        "oldest_entry": datetime.fromtimestamp(oldest).isoformat(),
+        "newest_entry": datetime.fromtimestamp(newest).isoformat(),
     }
 
@@ -1,21 +1,25 @@
 """Command-line interface for clixaw."""
 
 import os
-import subprocess
+import re
+import shlex
 import sys
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 import click
-import pyperclip
-import requests
 
-from clixaw import api, cache, config
-import clixaw.history as history_module
+from clixaw import api, cache, config, semcache
 
+# pyperclip, subprocess and clixaw.history are imported where they are used,
+# so paths that don't need them (--help, --cache-stats, ...) start faster.
+# requests is only imported by the api module once a request is made, so
+# API errors are recognised by class name (see api_error_message).
 
-# Dangerous command patterns that require confirmation
-DANGEROUS_PATTERNS = [
+
+# Dangerous command patterns that require confirmation (lowercase; immutable
+# since the compiled regex below is built from them once at import)
+DANGEROUS_PATTERNS = (
     "rm -rf",
     "rm -r",
     "rm -f",
@@ -28,13 +32,135 @@ DANGEROUS_PATTERNS = [
     "reboot",
     "halt",
     "poweroff",
-]
+)
+
+
+def _trie_pattern(patterns) -> str:
+    """
+    Build a regex matching any of the given literals, factored as a prefix trie.
+    
+    Shared prefixes are matched once ("rm -rf", "rm -r" and "rm -f" share
+    one "rm -" prefix followed by "(?:f|r)") instead of trying every
+    pattern separately. A pattern that extends another one is dropped,
+    since the shorter one already matches.
+    A space matches any run of whitespace, so "rm  -rf" is caught too.
+    """
+    trie: dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def build(node: dict) -> str:
+        if "" in node:
+            return ""
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items())
+        ]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+    
+    return build(trie)
+
+
+# All dangerous patterns as one case-insensitive regex, so a command is
+# scanned in a single pass without building a lowercased copy
+_DANGER_RE = re.compile(_trie_pattern(DANGEROUS_PATTERNS), re.IGNORECASE)
 
 
 def is_dangerous_command(command: str) -> bool:
     """Check if a command contains dangerous patterns."""
-    command_lower = command.lower()
-    return any(pattern in command_lower for pattern in DANGEROUS_PATTERNS)
+    return _DANGER_RE.search(command) is not None
+
+
+# Whether execute can replace this process with the shell (POSIX only)
+CAN_EXEC = os.name == "posix"
+
+# Separator between queries with --batch
+BATCH_SEPARATOR = ";;"
+
+# Characters that need a shell to interpret them
+_SHELL_META = frozenset("|&;<>()$`\\\"'*?[]{}~!#\n")
+
+
+def split_simple_command(command: str) -> Optional[List[str]]:
+    """
+    Split a command into argv if it can run without a shell.
+    
+    Args:
+        command: Shell command
+    
+    Returns:
+        Argument list, or None if the command uses shell syntax (pipes,
+        redirects, quoting, globs, variables, leading VAR=value assignments)
+    """
+    if not _SHELL_META.isdisjoint(command):
+        return None
+    
+    argv = shlex.split(command)
+    if not argv or "=" in argv[0]:
+        return None
+    
+    return argv
+
+
+def api_error_message(error: Exception) -> str:
+    """
+    Get the message to show for an error raised while translating a query.
+    
+    Args:
+        error: Exception raised by api.translate_query, or a DaemonError
+            carrying the class names of the error raised in the daemon
+    
+    Returns:
+        Human-readable error message
+    """
+    names = getattr(error, "class_names", None) or {cls.__name__ for cls in type(error).__mro__}
+    
+    if "RequestException" in names:
+        if "ConnectionError" in names:
+            return "Error: Could not connect to API. Check your internet connection and API URL."
+        if "Timeout" in names:
+            return "Error: API request timed out. Please try again."
+        if "HTTPError" in names:
+            status_code = getattr(error, "status_code", None)
+            if status_code is None:
+                status_code = error.response.status_code
+            return f"Error: API returned error {status_code}"
+    
+    if "ValueError" in names:
+        return f"Error: {error}"
+    
+    return f"Unexpected error: {error}"
+
+
+def confirm_command(command: str) -> bool:
+    """
+    Ask the user to confirm a command if it looks dangerous.
+    
+    Args:
+        command: Shell command about to be executed
+    
+    Returns:
+        True if the command may be executed, False if the user aborted
+    """
+    if not is_dangerous_command(command):
+        return True
+    
+    click.echo(
+        click.style("⚠️  Warning: This command may be dangerous!", fg="yellow"),
+        err=True,
+    )
+    click.echo(click.style(f"Command: {command}", fg="yellow"), err=True)
+    
+    if not click.confirm("Do you want to proceed?", default=False):
+        click.echo("Aborted.", err=True)
+        return False
+    
+    return True
 
 
 def execute_command(command: str, confirm: bool = True) -> int:
@@ -48,18 +174,21 @@ def execute_command(command: str, confirm: bool = True) -> int:
     Returns:
         Exit code of the command
     """
-    if confirm and is_dangerous_command(command):
-        click.echo(
-            click.style("⚠️  Warning: This command may be dangerous!", fg="yellow"),
-            err=True,
-        )
-        click.echo(click.style(f"Command: {command}", fg="yellow"), err=True)
-        
-        if not click.confirm("Do you want to proceed?", default=False):
-            click.echo("Aborted.", err=True)
-            return 1
+    if confirm and not confirm_command(command):
+        return 1
+    
+    import subprocess
     
     try:
+        argv = split_simple_command(command)
+        if argv is not None:
+            # Run the program directly, without starting a shell first
+            try:
+                return subprocess.run(argv, shell=False, check=False).returncode
+            except OSError:
+                # Not an executable (e.g. a shell builtin like cd); use the shell
+                pass
+        
         # Execute the command in the user's shell
         result = subprocess.run(
             command,
@@ -80,6 +209,41 @@ def execute_command(command: str, confirm: bool = True) -> int:
         return 1
 
 
+def exec_command(command: str) -> None:
+    """
+    Replace the current process with the shell running a command.
+    
+    Saves forking a child and tearing down Python afterwards when there is
+    nothing left to do once the command finishes. Commands without shell
+    syntax replace the process directly, skipping the shell too. Does not
+    return; the command's exit status becomes the process exit status.
+    
+    Args:
+        command: Shell command to execute
+    """
+    # atexit handlers don't run across exec, so write pending cache changes now
+    cache.flush_cache()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    
+    argv = split_simple_command(command)
+    if argv is not None:
+        try:
+            os.execvp(argv[0], argv)
+        except OSError:
+            # Not an executable (e.g. a shell builtin like cd); use the shell
+            pass
+    
+    try:
+        os.execv("/bin/sh", ["sh", "-c", command])
+    except OSError as e:
+        click.echo(
+            click.style(f"Error executing command: {e}", fg="red"),
+            err=True,
+        )
+        sys.exit(1)
+
+
 @click.command()
 @click.version_option(version="0.1.0", prog_name="clixaw")
 @click.argument("query", nargs=-1, required=False)
@@ -113,6 +277,12 @@ def execute_command(command: str, confirm: bool = True) -> int:
     envvar="XAW_MODEL",
     help="Model override (e.g., gemini-pro, gpt-4). Overrides config file and env var.",
 )
+@click.option(
+    "--batch",
+    "-b",
+    is_flag=True,
+    help=f"Translate several queries separated by '{BATCH_SEPARATOR}', one command per line",
+)
 @click.option(
     "--no-confirm",
     is_flag=True,
@@ -129,6 +299,11 @@ def execute_command(command: str, confirm: bool = True) -> int:
     is_flag=True,
     help="Disable cache for this request",
 )
+@click.option(
+    "--semantic-cache",
+    is_flag=True,
+    help="Also reuse cached commands for similarly worded queries (needs clixaw[semantic])",
+)
 @click.option(
     "--history",
     is_flag=True,
@@ -175,9 +350,11 @@ def cli(
     provider: Optional[str],
     api_key: Optional[str],
     model: Optional[str],
+    batch: bool,
     no_confirm: bool,
     copy: bool,
     no_cache: bool,
+    semantic_cache: bool,
     history: bool,
     repeat: Optional[int],
     clear_history: bool,
@@ -197,6 +374,12 @@ def cli(
             click.echo("Aborted.")
             return
         cache.clear_cache()
+        semcache.clear()
+        sock_path = os.getenv("XAW_DAEMON_SOCK")
+        if sock_path:
+            from clixaw import daemon
+            if daemon.is_supported():
+                daemon.clear_cache(sock_path)
         click.echo(click.style("✓ Cache cleared", fg="green"))
         return
     
@@ -204,6 +387,7 @@ def cli(
         if not click.confirm("Are you sure you want to clear all command history?"):
             click.echo("Aborted.")
             return
+        import clixaw.history as history_module
         history_module.clear_history()
         click.echo(click.style("✓ Command history cleared", fg="green"))
         return
@@ -229,9 +413,11 @@ def cli(
         provider=provider,
         api_key=api_key,
         model=model,
+        batch=batch,
         no_confirm=no_confirm,
         copy=copy,
         no_cache=no_cache,
+        semantic_cache=semantic_cache,
     )
 
 
@@ -245,6 +431,8 @@ def main(
     no_confirm: bool,
     copy: bool,
     no_cache: bool,
+    semantic_cache: bool = False,
+    batch: bool = False,
 ) -> None:
     """
     Translate natural language queries to shell commands using cmd.xaw.me API.
@@ -258,7 +446,11 @@ def main(
         xaw "git push new branch"
     
         xaw --execute list files in current directory
+    
+        xaw --batch "list files ;; show disk usage ;; git status"
     """
+    import clixaw.history as history_module
+    
     # Join all query parts into a single string
     query_str = " ".join(query)
     
@@ -266,43 +458,87 @@ def main(
         click.echo(click.style("Error: Query cannot be empty", fg="red"), err=True)
         sys.exit(1)
     
+    if batch and execute:
+        click.echo(click.style("Error: --batch can't be used with --execute", fg="red"), err=True)
+        sys.exit(1)
+    
+    if semantic_cache and not semcache.is_available():
+        click.echo(
+            click.style(
+                "Warning: --semantic-cache needs numpy and fastembed "
+                '(pip install "clixaw[semantic]"); using the exact-match cache only',
+                fg="yellow",
+            ),
+            err=True,
+        )
+    
     # Load configuration from config file
     config_provider = config.get_provider_config()
     
     # Priority: CLI flags > Environment variables > Config file > Defaults
-    # For provider, api_key, model: CLI > Env > Config
-    final_provider = provider or os.getenv("XAW_PROVIDER") or config_provider.get("provider")
-    final_api_key = api_key or os.getenv("XAW_API_KEY") or config_provider.get("api_key")
-    final_model = model or os.getenv("XAW_MODEL") or config_provider.get("model")
+    # Click already fills each option from its envvar when the flag isn't
+    # given, so the parameters cover both CLI flags and environment variables
+    final_provider = provider or config_provider.get("provider")
+    final_api_key = api_key or config_provider.get("api_key")
+    final_model = model or config_provider.get("model")
     
     # For api_url: CLI > Env > Config > Default
-    final_api_url = api_url or os.getenv("XAW_API_URL") or config_provider.get("api_url")
+    # (resolved here rather than in the API client, so a daemon started by
+    # another shell doesn't fall back to its own XAW_API_URL)
+    final_api_url = api_url or config_provider.get("api_url") or api.get_api_url()
+    
+    translate_args = {
+        "api_url": final_api_url,
+        "provider": final_provider,
+        "api_key": final_api_key,
+        "model": final_model,
+        "use_cache": not no_cache,
+        "semantic_cache": semantic_cache,
+    }
+    
+    if batch:
+        queries = [part.strip() for part in query_str.split(BATCH_SEPARATOR) if part.strip()]
+        if not queries:
+            click.echo(click.style("Error: Query cannot be empty", fg="red"), err=True)
+            sys.exit(1)
+        batch_main(queries, translate_args, copy)
+        return
+    
+    # With XAW_DAEMON_SOCK set, a background daemon translates the query so
+    # its HTTP connection and caches are reused across invocations
+    sock_path = os.getenv("XAW_DAEMON_SOCK")
     
     try:
-        # Call API to translate query
-        command = api.translate_query(
-            query_str,
-            api_url=final_api_url,
-            provider=final_provider,
-            api_key=final_api_key,
-            model=final_model,
-            use_cache=not no_cache,
-        )
+        command = None
+        if sock_path:
+            from clixaw import daemon
+            if daemon.is_supported():
+                try:
+                    command = daemon.translate_query(sock_path, query_str, **translate_args)
+                except daemon.DaemonUnavailable:
+                    # Translate in this process instead
+                    pass
+        
+        if command is None:
+            # Call API to translate query
+            command = api.translate_query(query_str, **translate_args)
         
         if copy:
-            # Copy to clipboard
-            try:
-                pyperclip.copy(command)
-                click.echo(click.style("✓ Command copied to clipboard", fg="green"))
-            except Exception as e:
-                click.echo(
-                    click.style(f"Warning: Could not copy to clipboard: {e}", fg="yellow"),
-                    err=True,
-                )
+            copy_to_clipboard(command)
         
         if execute:
             # Execute the command
-            exit_code = execute_command(command, confirm=not no_confirm)
+            if not no_confirm and not confirm_command(command):
+                exit_code = 1
+            elif CAN_EXEC and not copy:
+                # Nothing is left to do afterwards, so hand the process over to
+                # the shell. The exit code isn't known yet, so it isn't logged.
+                # (--copy keeps Python alive, as some clipboard backends only
+                # hold the copied text while this process exists.)
+                history_module.add_to_history(query_str, command, executed=True)
+                exec_command(command)
+            else:
+                exit_code = execute_command(command, confirm=False)
             # Log to history with execution status
             history_module.add_to_history(query_str, command, executed=True, exit_code=exit_code)
             sys.exit(exit_code)
@@ -312,47 +548,73 @@ def main(
             # Log to history (not executed)
             history_module.add_to_history(query_str, command, executed=False)
     
-    except requests.exceptions.ConnectionError:
+    except Exception as e:
         click.echo(
-            click.style(
-                "Error: Could not connect to API. Check your internet connection and API URL.",
-                fg="red",
-            ),
+            click.style(api_error_message(e), fg="red"),
             err=True,
         )
         sys.exit(1)
+
+
+def batch_main(queries: list, translate_args: dict, copy: bool) -> None:
+    """
+    Translate several queries at once and print one command per line.
     
-    except requests.exceptions.Timeout:
-        click.echo(
-            click.style("Error: API request timed out. Please try again.", fg="red"),
-            err=True,
-        )
-        sys.exit(1)
+    A query that fails is reported with its text on stderr; the others are
+    still printed, and the exit code is 1.
     
-    except requests.exceptions.HTTPError as e:
-        click.echo(
-            click.style(f"Error: API returned error {e.response.status_code}", fg="red"),
-            err=True,
-        )
-        sys.exit(1)
+    Args:
+        queries: Natural language queries
+        translate_args: Keyword arguments for api.translate_query_batch
+        copy: Whether to copy the commands to the clipboard
+    """
+    import clixaw.history as history_module
     
-    except ValueError as e:
+    try:
+        results = api.translate_query_batch(queries, **translate_args)
+    except Exception as e:
         click.echo(
-            click.style(f"Error: {e}", fg="red"),
+            click.style(api_error_message(e), fg="red"),
             err=True,
         )
         sys.exit(1)
     
+    commands = []
+    for query, result in zip(queries, results):
+        if isinstance(result, Exception):
+            click.echo(
+                click.style(f"{api_error_message(result)} (query: {query})", fg="red"),
+                err=True,
+            )
+            continue
+        click.echo(result)
+        history_module.add_to_history(query, result, executed=False)
+        commands.append(result)
+    
+    if copy and commands:
+        copy_to_clipboard("\n".join(commands))
+    
+    if len(commands) < len(results):
+        sys.exit(1)
+
+
+def copy_to_clipboard(text: str) -> None:
+    """Copy text to the clipboard, warning if no clipboard is available."""
+    try:
+        import pyperclip
+        pyperclip.copy(text)
+        click.echo(click.style("✓ Command copied to clipboard", fg="green"))
     except Exception as e:
         click.echo(
-            click.style(f"Unexpected error: {e}", fg="red"),
+            click.style(f"Warning: Could not copy to clipboard: {e}", fg="yellow"),
             err=True,
         )
-        sys.exit(1)
 
 
 def show_history(limit: int, all: bool) -> None:
     """Show command history."""
+    import clixaw.history as history_module
+    
     entries = history_module.get_history(limit=None if all else limit)
     
     if not entries:
@@ -360,12 +622,7 @@ def show_history(limit: int, all: bool) -> None:
         return
     
     for idx, entry in enumerate(entries):
-        timestamp_str = entry.get("timestamp", "")
-        try:
-            dt = datetime.fromisoformat(timestamp_str)
-            timestamp_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-        except (ValueError, TypeError):
-            pass
+        timestamp_str = history_module.format_timestamp(entry.get("timestamp"))
         
         query = entry.get("query", "")
         command = entry.get("command", "")
@@ -375,7 +632,10 @@ def show_history(limit: int, all: bool) -> None:
         # Format output
         status = ""
         if executed:
-            if exit_code == 0:
+            if exit_code is None:
+                # Executed by replacing the process, so the status is unknown
+                status = click.style(" (executed)", fg="cyan")
+            elif exit_code == 0:
                 status = click.style(" ✓", fg="green")
             else:
                 status = click.style(f" ✗ (exit {exit_code})", fg="red")
@@ -389,6 +649,8 @@ def show_history(limit: int, all: bool) -> None:
 
 def repeat_command(index: int, execute: bool, no_confirm: bool) -> None:
     """Repeat a command from history by index."""
+    import clixaw.history as history_module
+    
     entry = history_module.get_history_entry(index)
     
     if entry is None:
@@ -412,7 +674,13 @@ def repeat_command(index: int, execute: bool, no_confirm: bool) -> None:
     click.echo(f"Command: {command}")
     
     if execute:
-        exit_code = execute_command(command, confirm=not no_confirm)
+        if not no_confirm and not confirm_command(command):
+            exit_code = 1
+        elif CAN_EXEC:
+            history_module.add_to_history(f"[repeat] {query}", command, executed=True)
+            exec_command(command)
+        else:
+            exit_code = execute_command(command, confirm=False)
         # Log the repeat to history
         history_module.add_to_history(
             f"[repeat] {query}",
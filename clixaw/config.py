@@ -1,6 +1,7 @@
 """Configuration management for clixaw."""
 
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -10,8 +11,18 @@ except ImportError:
     tomli = None
 
 
+# Last parsed config file and the (mtime, size) it was parsed at
+_CONFIG_CACHE = {"stamp": None, "data": {}}
+
+
+@lru_cache(maxsize=1)
 def get_config_dir() -> Path:
-    """Get the configuration directory path."""
+    """
+    Get the configuration directory path.
+    
+    Memoized for the process lifetime; call get_config_dir.cache_clear()
+    after changing XDG_CONFIG_HOME or HOME.
+    """
     # Use XDG_CONFIG_HOME if available, otherwise use ~/.config
     config_home = os.getenv("XDG_CONFIG_HOME")
     if config_home:
@@ -20,6 +31,7 @@ def get_config_dir() -> Path:
         return Path.home() / ".config" / "clixaw"
 
 
+@lru_cache(maxsize=1)
 def get_config_path() -> Path:
     """Get the path to the config.toml file."""
     return get_config_dir() / "config.toml"
@@ -29,13 +41,27 @@ def load_config() -> dict:
     """
     Load configuration from config.toml file.
     
+    The file is only parsed again when its modification time or size
+    changes, so repeated calls (and a long-running daemon) cost one stat.
+    Until then the same dict is returned, so callers must not modify it.
+    Call clear_config_cache() to force a reload.
+    
     Returns:
         Dictionary containing configuration values, or empty dict if file doesn't exist
     """
     config_path = get_config_path()
     
-    if not config_path.exists():
-        return {}
+    try:
+        st = config_path.stat()
+    except OSError:
+        # No config file
+        if _CONFIG_CACHE["stamp"] is not None:
+            clear_config_cache()
+        return _CONFIG_CACHE["data"]
+    
+    stamp = (st.st_mtime_ns, st.st_size)
+    if stamp == _CONFIG_CACHE["stamp"]:
+        return _CONFIG_CACHE["data"]
     
     if tomli is None:
         # Should not happen if dependencies are installed, but handle gracefully
@@ -43,10 +69,20 @@ def load_config() -> dict:
     
     try:
         with open(config_path, "rb") as f:
-            return tomli.load(f)
+            data = tomli.load(f)
     except Exception:
         # If config file is malformed, return empty dict
-        return {}
+        data = {}
+    
+    _CONFIG_CACHE["stamp"] = stamp
+    _CONFIG_CACHE["data"] = data
+    return data
+
+
+def clear_config_cache() -> None:
+    """Forget the parsed config file so the next load_config() reads it again."""
+    _CONFIG_CACHE["stamp"] = None
+    _CONFIG_CACHE["data"] = {}
 
 
 def get_config_value(section: Optional[str], key: str, default: Optional[str] = None) -> Optional[str]:
@@ -0,0 +1,340 @@
+"""Optional background process that keeps the API session and caches warm.
+
+When XAW_DAEMON_SOCK points to a Unix socket path, the CLI sends queries to
+a daemon listening there instead of translating them itself. The daemon
+holds one keep-alive HTTP session and the in-memory caches across queries,
+so only the first query pays for the TLS handshake and cache loading. It is
+started on demand and exits after being idle for a while.
+
+Settings are resolved by the client and sent with each query. A daemon
+only answers clients whose environment-dependent settings (config
+directory, XAW_CACHE_TTL, XAW_SEM_THRESHOLD) match the ones it was started
+with; other clients translate their queries themselves.
+
+Run it directly with: python -m clixaw.daemon SOCKET_PATH
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Optional, Dict, Any, Iterable
+
+from clixaw import api, cache, config
+
+
+# Seconds without a request before the daemon exits
+DAEMON_IDLE_TIMEOUT_SECONDS = 10 * 60
+
+# Seconds the client waits for an answer; covers a slow API plus fallback
+CLIENT_TIMEOUT_SECONDS = 30.0
+
+# Seconds the client waits for a newly spawned daemon to start listening
+SPAWN_WAIT_SECONDS = 2.0
+
+# Largest request line the daemon accepts
+MAX_REQUEST_BYTES = 64 * 1024
+
+# translate_query arguments a client may pass
+_TRANSLATE_ARGS = (
+    "api_url",
+    "provider",
+    "api_key",
+    "model",
+    "use_cache",
+    "semantic_cache",
+)
+
+
+class DaemonUnavailable(Exception):
+    """The daemon could not be reached or gave no usable answer."""
+
+
+class DaemonError(Exception):
+    """
+    An error raised while the daemon was translating a query.
+    
+    Attributes:
+        class_names: Names of the original exception class and its bases,
+            so callers can tell errors apart without importing requests
+        status_code: HTTP status code for HTTP errors, None otherwise
+    """
+    
+    def __init__(
+        self,
+        message: str,
+        class_names: Iterable[str],
+        status_code: Optional[int] = None,
+    ) -> None:
+        super().__init__(message)
+        self.class_names = set(class_names)
+        self.status_code = status_code
+
+
+def is_supported() -> bool:
+    """Check whether this platform has Unix sockets and user IDs."""
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def get_settings() -> Dict[str, Optional[str]]:
+    """
+    Get the settings this process takes from its environment.
+    
+    The daemon would otherwise use the values of whichever client spawned
+    it, so the client sends its own and the daemon compares them.
+    """
+    return {
+        "config_dir": str(config.get_config_dir()),
+        "cache_ttl": os.getenv("XAW_CACHE_TTL"),
+        "sem_threshold": os.getenv("XAW_SEM_THRESHOLD"),
+    }
+
+
+def _connect(sock_path: str) -> socket.socket:
+    """
+    Connect to the daemon socket.
+    
+    Raises:
+        PermissionError: If the socket belongs to another user, who could
+            read the API key or answer with any command
+        OSError: If nothing listens on the socket
+    """
+    if os.stat(sock_path).st_uid != os.getuid():
+        raise PermissionError(f"{sock_path} is owned by another user")
+    
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CLIENT_TIMEOUT_SECONDS)
+    try:
+        sock.connect(sock_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _spawn(sock_path: str) -> socket.socket:
+    """
+    Start a daemon in the background and connect to it.
+    
+    Raises:
+        OSError: If the daemon doesn't start listening in time
+    """
+    import subprocess
+    
+    subprocess.Popen(
+        [sys.executable, "-m", "clixaw.daemon", sock_path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    
+    deadline = time.monotonic() + SPAWN_WAIT_SECONDS
+    while True:
+        try:
+            return _connect(sock_path)
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+
+def _request(sock_path: str, message: Dict[str, Any], spawn: bool = True) -> Dict[str, Any]:
+    """
+    Send one request to the daemon and return its reply.
+    
+    Args:
+        sock_path: Path of the daemon socket
+        message: Request to send
+        spawn: Whether to start a daemon if none is listening
+    
+    Returns:
+        Decoded reply
+    
+    Raises:
+        DaemonUnavailable: If the daemon can't be reached or the reply is unusable
+    """
+    try:
+        try:
+            sock = _connect(sock_path)
+        except PermissionError:
+            raise
+        except OSError:
+            if not spawn:
+                raise
+            sock = _spawn(sock_path)
+        
+        with sock:
+            sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                reply = json.loads(f.readline())
+    except (OSError, ValueError) as e:
+        raise DaemonUnavailable(str(e)) from e
+    
+    if not isinstance(reply, dict):
+        raise DaemonUnavailable("Invalid reply from daemon")
+    
+    if "unavailable" in reply:
+        raise DaemonUnavailable(str(reply["unavailable"]))
+    
+    return reply
+
+
+def translate_query(sock_path: str, query: str, **kwargs: Any) -> str:
+    """
+    Translate a query through the daemon, starting one if needed.
+    
+    Args:
+        sock_path: Path of the daemon socket
+        query: Natural language query
+        **kwargs: Same keyword arguments as api.translate_query
+    
+    Returns:
+        Shell command string
+    
+    Raises:
+        DaemonUnavailable: If the daemon can't be used; translate directly instead
+        DaemonError: If translating the query failed inside the daemon
+    """
+    args = {name: kwargs[name] for name in _TRANSLATE_ARGS if name in kwargs}
+    reply = _request(
+        sock_path,
+        {"op": "translate", "query": query, "args": args, "settings": get_settings()},
+    )
+    
+    if "error" in reply:
+        error = reply["error"]
+        raise DaemonError(
+            error.get("message", ""),
+            error.get("class_names", ()),
+            error.get("status_code"),
+        )
+    
+    command = reply.get("command")
+    if not isinstance(command, str):
+        raise DaemonUnavailable("Invalid reply from daemon")
+    
+    return command
+
+
+def clear_cache(sock_path: str) -> None:
+    """Tell a running daemon to drop its in-memory cache (never starts one)."""
+    try:
+        _request(sock_path, {"op": "clear_cache", "settings": get_settings()}, spawn=False)
+    except DaemonUnavailable:
+        pass
+
+
+def _error_reply(error: Exception) -> Dict[str, Any]:
+    """Describe an exception so the client can rebuild its error message."""
+    response = getattr(error, "response", None)
+    return {
+        "error": {
+            "message": str(error),
+            "class_names": [cls.__name__ for cls in type(error).__mro__],
+            "status_code": getattr(response, "status_code", None),
+        }
+    }
+
+
+def _handle(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one request and build the reply."""
+    op = message.get("op")
+    settings = message.get("settings")
+    own_settings = get_settings()
+    
+    if op == "clear_cache":
+        # Only the cache directory matters for dropping the cache
+        if isinstance(settings, dict) and settings.get("config_dir") == own_settings["config_dir"]:
+            cache.clear_cache()
+        return {}
+    
+    if settings != own_settings:
+        # The client would get results for another config or TTL
+        return {"unavailable": "Daemon was started with different settings"}
+    
+    if op == "translate":
+        args = message.get("args") or {}
+        args = {name: args[name] for name in _TRANSLATE_ARGS if name in args}
+        try:
+            command = api.translate_query(message.get("query", ""), **args)
+        except Exception as e:
+            return _error_reply(e)
+        finally:
+            # The daemon may be killed at any time, so don't hold changes back
+            cache.flush_cache()
+        return {"command": command}
+    
+    return _error_reply(ValueError(f"Unknown daemon request: {op}"))
+
+
+def serve(sock_path: str, idle_timeout: float = DAEMON_IDLE_TIMEOUT_SECONDS) -> None:
+    """
+    Answer requests on a Unix socket until idle for idle_timeout seconds.
+    
+    Requests are handled one at a time, since the caches aren't shared
+    between threads. Returns immediately if another daemon already listens
+    on the socket.
+    
+    Args:
+        sock_path: Path of the socket to listen on
+        idle_timeout: Seconds without a request before exiting
+    """
+    try:
+        _connect(sock_path).close()
+        return
+    except OSError:
+        pass
+    
+    # Only the current user may connect
+    os.umask(0o077)
+    
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    inode = None
+    try:
+        try:
+            os.unlink(sock_path)
+        except FileNotFoundError:
+            pass
+        server.bind(sock_path)
+        server.listen(8)
+        server.settimeout(idle_timeout)
+        inode = os.stat(sock_path).st_ino
+        
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                break
+            
+            with conn:
+                conn.settimeout(CLIENT_TIMEOUT_SECONDS)
+                try:
+                    with conn.makefile("rb") as f:
+                        line = f.readline(MAX_REQUEST_BYTES)
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("Request must be a JSON object")
+                    reply = _handle(message)
+                    conn.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+                except (OSError, ValueError):
+                    # Client went away or sent garbage; wait for the next one
+                    continue
+    finally:
+        server.close()
+        # Remove the socket unless a newer daemon has replaced it
+        try:
+            if inode is not None and os.stat(sock_path).st_ino == inode:
+                os.unlink(sock_path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m clixaw.daemon SOCKET_PATH")
+    # Exit through serve's cleanup when killed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    serve(sys.argv[1])
@@ -1,56 +1,142 @@
 """Command history management for clixaw."""
 
 import json
+import os
+import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 
 from clixaw import config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Number of history entries kept
+MAX_HISTORY_ENTRIES = 1000
+
+# Once the history file grows past this size it is trimmed to MAX_HISTORY_ENTRIES
+HISTORY_TRIM_BYTES = 1024 * 1024
+
+
+def _format_entry(entry: Dict[str, Any]) -> bytes:
+    """Format a history entry as one UTF-8 JSON line, using orjson if installed."""
+    if orjson is not None:
+        return orjson.dumps(entry) + b"\n"
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _parse_entry(line: bytes) -> Any:
+    """Parse one line of the history file, using orjson if installed."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
 
 def get_history_path() -> Path:
-    """Get the path to the history file."""
-    return config.get_config_dir() / "history.json"
+    """Get the path to the history file (one JSON entry per line)."""
+    return config.get_config_dir() / "history.jsonl"
+
+
+def _migrate_legacy_history() -> None:
+    """Convert a history.json file written by older versions to history.jsonl."""
+    legacy_path = config.get_config_dir() / "history.json"
+    
+    if not legacy_path.exists() or get_history_path().exists():
+        return
+    
+    try:
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        # Leave a file we can't read alone rather than lose it
+        return
+    
+    if not isinstance(history, list):
+        return
+    
+    # Only remove the old file once its entries are safely in the new one
+    if not save_history(history[-MAX_HISTORY_ENTRIES:]):
+        return
+    
+    try:
+        legacy_path.unlink()
+    except IOError:
+        pass
 
 
-def load_history() -> List[Dict[str, Any]]:
+def load_history(limit: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Load command history from file.
     
+    Args:
+        limit: Only load the last `limit` entries (None for all kept entries)
+    
     Returns:
         List of history entries, each containing query, command, timestamp, and executed flag
     """
+    _migrate_legacy_history()
     history_path = get_history_path()
     
     if not history_path.exists():
         return []
     
+    # The file may hold a few more entries than the limit until it is trimmed
+    maxlen = MAX_HISTORY_ENTRIES if limit is None else max(0, min(limit, MAX_HISTORY_ENTRIES))
+    
+    history = []
     try:
-        with open(history_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        # If file is corrupted, return empty list
+        with open(history_path, "rb") as f:
+            # Keep only the tail of the file, so only those lines get parsed
+            lines = deque(f, maxlen=maxlen)
+    except IOError:
         return []
+    
+    for line in lines:
+        try:
+            history.append(_parse_entry(line))
+        except ValueError:
+            # Skip a corrupted or half-written line
+            continue
+    
+    return history
 
 
-def save_history(history: List[Dict[str, Any]]) -> None:
+def save_history(history: List[Dict[str, Any]]) -> bool:
     """
-    Save command history to file.
+    Save command history to file, replacing its contents.
     
     Args:
         history: List of history entries to save
+    
+    Returns:
+        True if the file was written, False if writing failed
     """
     history_path = get_history_path()
+    tmp_path = history_path.with_suffix(".jsonl.tmp")
     
     # Ensure config directory exists
     history_path.parent.mkdir(parents=True, exist_ok=True)
     
     try:
-        with open(history_path, "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        # Create the file private to the user, like add_to_history does
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(_format_entry(entry) for entry in history)
+        os.replace(tmp_path, history_path)
     except IOError:
-        # Silently fail if we can't write history
-        pass
+        # Silently fail if we can't write history, leaving the old file intact
+        try:
+            tmp_path.unlink()
+        except IOError:
+            pass
+        return False
+    
+    return True
 
 
 def add_to_history(
@@ -68,23 +154,60 @@ def add_to_history(
         executed: Whether the command was executed
         exit_code: Exit code if command was executed (None if not executed)
     """
-    history = load_history()
+    _migrate_legacy_history()
+    history_path = get_history_path()
     
     entry = {
-        "timestamp": datetime.now().isoformat(),
+        # Nanoseconds since the epoch; only formatted when shown
+        "timestamp": time.time_ns(),
         "query": query,
         "command": command,
         "executed": executed,
         "exit_code": exit_code,
     }
     
-    history.append(entry)
+    # Ensure config directory exists
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Append a single line instead of rewriting the whole file. One write(2)
+    # on an O_APPEND descriptor lands as a whole line even when several
+    # invocations append at once, so no lock file is needed.
+    try:
+        fd = os.open(history_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, _format_entry(entry))
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        
+        # Trim to the last entries only once the file has grown large
+        if size > HISTORY_TRIM_BYTES:
+            save_history(load_history())
+    except (IOError, OSError):
+        # Silently fail if we can't write history
+        pass
+
+
+def format_timestamp(timestamp: Union[int, str, None]) -> str:
+    """
+    Format an entry's timestamp for display.
+    
+    Args:
+        timestamp: Nanoseconds since the epoch, or an ISO 8601 string as
+            written by older versions
     
-    # Keep only last 1000 entries to prevent file from growing too large
-    if len(history) > 1000:
-        history = history[-1000:]
+    Returns:
+        Local time as "YYYY-MM-DD HH:MM:SS", or the raw value if it can't be parsed
+    """
+    try:
+        if isinstance(timestamp, str):
+            dt = datetime.fromisoformat(timestamp)
+        else:
+            dt = datetime.fromtimestamp(timestamp / 1e9)
+    except (ValueError, TypeError, OverflowError, OSError):
+        return "" if timestamp is None else str(timestamp)
     
-    save_history(history)
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
 
 
 def get_history(limit: Optional[int] = None) -> List[Dict[str, Any]]:
@@ -97,26 +220,22 @@ def get_history(limit: Optional[int] = None) -> List[Dict[str, Any]]:
     Returns:
         List of history entries, most recent first
     """
-    history = load_history()
+    history = load_history(limit)
     
     # Return most recent first
     history.reverse()
     
-    if limit is not None:
-        history = history[:limit]
-    
     return history
 
 
 def clear_history() -> None:
     """Clear all command history."""
-    history_path = get_history_path()
-    
-    if history_path.exists():
-        try:
-            history_path.unlink()
-        except IOError:
-            pass
+    for history_path in (get_history_path(), config.get_config_dir() / "history.json"):
+        if history_path.exists():
+            try:
+                history_path.unlink()
+            except IOError:
+                pass
 
 
 def get_history_entry(index: int) -> Optional[Dict[str, Any]]:
@@ -129,9 +248,12 @@ def get_history_entry(index: int) -> Optional[Dict[str, Any]]:
     Returns:
         History entry dict or None if index is out of range
     """
-    history = get_history()
+    if index < 0:
+        return None
+    
+    history = get_history(limit=index + 1)
     
-    if 0 <= index < len(history):
+    if index < len(history):
         return history[index]
     
     return None
@@ -0,0 +1,241 @@
+"""Optional semantic cache that matches paraphrased queries by embedding similarity."""
+
+import importlib.util
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+from clixaw import cache, config
+
+
+# Default minimum cosine similarity for a cached query to count as a match
+DEFAULT_SEM_THRESHOLD = 0.92
+
+# Small ONNX embedding model used by fastembed
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+# Loaded embedding model, created on first use
+_MODEL = None
+
+
+def is_available() -> bool:
+    """
+    Check whether the optional dependencies (numpy, fastembed) are installed.
+    
+    Only looks the packages up without importing them, since fastembed pulls
+    in onnxruntime; they are imported on the first semantic lookup.
+    """
+    return all(
+        importlib.util.find_spec(name) is not None for name in ("numpy", "fastembed")
+    )
+
+
+def get_vectors_path() -> Path:
+    """Get the path to the file holding the cached query embeddings."""
+    return config.get_config_dir() / "semcache.npy"
+
+
+def get_entries_path() -> Path:
+    """Get the path to the file holding the cached queries and commands."""
+    return config.get_config_dir() / "semcache.json"
+
+
+def get_threshold() -> float:
+    """Get the similarity threshold from XAW_SEM_THRESHOLD or use default."""
+    try:
+        return float(os.getenv("XAW_SEM_THRESHOLD", DEFAULT_SEM_THRESHOLD))
+    except ValueError:
+        return DEFAULT_SEM_THRESHOLD
+
+
+def _scope(api_url: str, provider: Optional[str], model: Optional[str]) -> str:
+    """Matches are only returned for the same API URL, provider and model."""
+    return f"{api_url}|{provider or ''}|{model or ''}"
+
+
+@lru_cache(maxsize=8)
+def _embed(text: str):
+    """
+    Embed a query as a unit-length float32 vector.
+    
+    Memoized so a lookup followed by a store for the same query only runs
+    the model once.
+    """
+    global _MODEL
+    
+    import numpy as np
+    from fastembed import TextEmbedding
+    
+    if _MODEL is None:
+        _MODEL = TextEmbedding(model_name=DEFAULT_EMBEDDING_MODEL)
+    
+    vector = np.asarray(next(iter(_MODEL.embed([text]))), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _load() -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    Load cached embeddings and their entries.
+    
+    Returns:
+        (matrix of shape (n, dim), list of n entries); empty if missing or
+        out of sync
+    """
+    import numpy as np
+    
+    empty = (np.zeros((0, 0), dtype=np.float32), [])
+    vectors_path = get_vectors_path()
+    entries_path = get_entries_path()
+    
+    if not vectors_path.exists() or not entries_path.exists():
+        return empty
+    
+    try:
+        vectors = np.load(vectors_path)
+        with open(entries_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (ValueError, IOError):
+        # If either file is corrupted, start over
+        return empty
+    
+    if vectors.ndim != 2 or len(vectors) != len(entries):
+        return empty
+    
+    return vectors, entries
+
+
+def _save(vectors: Any, entries: List[Dict[str, Any]]) -> None:
+    """Save embeddings and entries, replacing each file atomically."""
+    import numpy as np
+    
+    vectors_path = get_vectors_path()
+    entries_path = get_entries_path()
+    
+    # Ensure config directory exists
+    vectors_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        tmp_vectors = vectors_path.with_suffix(".tmp.npy")
+        np.save(tmp_vectors, vectors)
+        
+        tmp_entries = entries_path.with_suffix(".json.tmp")
+        with open(tmp_entries, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_entries, entries_path)
+    except IOError:
+        # Silently fail if we can't write the semantic cache
+        pass
+
+
+def lookup(
+    query: str,
+    api_url: str,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+) -> Optional[Tuple[str, float]]:
+    """
+    Find the command of a cached query similar enough to this one.
+    
+    Entries older than the exact-match cache's TTL are ignored, so the
+    semantic cache never serves a command the exact cache would refetch.
+    
+    Args:
+        query: Natural language query
+        api_url: API URL
+        provider: Optional provider name
+        model: Optional model name
+    
+    Returns:
+        (cached command, time it was stored) if a fresh query with cosine
+        similarity at or above the threshold was found, None otherwise
+    """
+    import numpy as np
+    
+    vectors, entries = _load()
+    if not entries:
+        return None
+    
+    # Stored vectors are unit length, so one matrix-vector product gives the
+    # cosine similarity against every cached query
+    scores = vectors @ _embed(query)
+    
+    scope = _scope(api_url, provider, model)
+    ttl = cache.get_cache_config().get("ttl", cache.DEFAULT_CACHE_TTL_SECONDS)
+    oldest = time.time() - ttl
+    # Only compare against fresh entries for the same API, provider and model
+    usable = np.fromiter(
+        (e.get("scope") == scope and e.get("timestamp", 0) >= oldest for e in entries),
+        dtype=bool,
+    )
+    scores[~usable] = -1.0
+    
+    best = int(np.argmax(scores))
+    if scores[best] < get_threshold():
+        return None
+    
+    entry = entries[best]
+    return entry.get("command"), entry["timestamp"]
+
+
+def store(
+    query: str,
+    command: str,
+    api_url: str,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+) -> None:
+    """
+    Add a query and its command to the semantic cache.
+    
+    Uses the same max size as the exact-match cache, dropping the oldest
+    entries first.
+    
+    Args:
+        query: Natural language query
+        command: Translated shell command
+        api_url: API URL
+        provider: Optional provider name
+        model: Optional model name
+    """
+    import numpy as np
+    
+    vectors, entries = _load()
+    vector = _embed(query)
+    
+    if entries and vectors.shape[1] != vector.shape[0]:
+        # Embedding model changed; old vectors can't be compared
+        vectors, entries = None, []
+    
+    if entries:
+        vectors = np.vstack([vectors, vector[np.newaxis, :]])
+    else:
+        vectors = vector[np.newaxis, :]
+    entries.append({
+        "query": query,
+        "command": command,
+        "scope": _scope(api_url, provider, model),
+        "timestamp": time.time(),
+    })
+    
+    max_size = cache.get_cache_config().get("max_size", cache.DEFAULT_MAX_CACHE_SIZE)
+    if len(entries) > max_size:
+        vectors = vectors[-max_size:]
+        entries = entries[-max_size:]
+    
+    _save(vectors, entries)
+
+
+def clear() -> None:
+    """Clear the semantic cache."""
+    for path in (get_vectors_path(), get_entries_path()):
+        if path.exists():
+            try:
+                path.unlink()
+            except IOError:
+                pass